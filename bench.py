@@ -2,7 +2,9 @@
 
 import argparse
 import json
+import math
 import os
+import random
 import statistics
 import subprocess
 import sys
@@ -10,6 +12,7 @@ import tempfile
 import textwrap
 import time
 
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from enum import Enum
 from pprint import PrettyPrinter
@@ -23,6 +26,9 @@ class Op(Enum):
     WRITE_IOPS = ("write", "iops")
     READ_BW = ("read", "bw")
     WRITE_BW = ("write", "bw")
+    FILE_CREATE = ("create", "files")
+    FILE_STAT = ("stat", "files")
+    FILE_DELETE = ("delete", "files")
 
     @property
     def unit(self):
@@ -30,12 +36,14 @@ class Op(Enum):
             return "IOPS"
         if self.value[1] == "bw":
             return "KB/s"
+        if self.value[1] == "files":
+            return "files/s"
         raise NotImplemented(f"unit not implemented for Op: {self.name}, {self.value[1]}")
 
     @property
     def data_key_suffixes(self):
         data_key_suffixes = ["max", "mean", "min"]
-        if self.value[1] == "iops":
+        if self.value[1] in ["iops", "files"]:
             data_key_suffixes.append("stddev")
             return data_key_suffixes
         if self.value[1] == "bw":
@@ -45,19 +53,39 @@ class Op(Enum):
             f"data_key_suffixes not implemented for Op: {self.name}, {self.value[1]}"
         )
 
+    @property
+    def ddir(self):
+        """
+        Key of the fio results section for the op. fio's file engines account
+        each file operation as a read.
+        """
+        if self.value[1] == "files":
+            return "read"
+        return self.value[0]
+
+    @property
+    def data_key(self):
+        """
+        Prefix of the fio result keys for the op. File operations are reported
+        as IOPS by fio.
+        """
+        if self.value[1] == "files":
+            return "iops"
+        return self.value[1]
+
 
-def extract_results(op: Op, result: Union[List,Dict]):
+def extract_results(op: Op, result: Union[List,Dict], latency=False):
     try:
         if isinstance(result, list):
             print("Using first list entry from new kubestr output format")
             result = result[0]
         assert isinstance(result, dict)
-        data = result["Raw"]["result"]["jobs"][0][op.value[0]]
+        data = result["Raw"]["result"]["jobs"][0][op.ddir]
     except Exception as e:
         print(e)
         print(result)
         raise e
-    pruned = {"display": data[op.value[1]]}
+    pruned = {"display": data[op.data_key]}
 
     def _clean(suffix):
         """
@@ -68,18 +96,119 @@ def extract_results(op: Op, result: Union[List,Dict]):
         return suffix
 
     for suffix in op.data_key_suffixes:
-        key = f"{op.value[1]}_{suffix}"
+        key = f"{op.data_key}_{suffix}"
         pruned[_clean(suffix)] = data[key]
+
+    if op.unit == "files/s":
+        # The file operation jobs aren't time based and often end before fio
+        # has collected multiple 500ms samples, which the min, max, mean and
+        # stddev are computed from. Use the overall rate instead.
+        pruned["mean"] = data["iops"]
+        if data.get("iops_samples", 0) < 2:
+            pruned["min"] = data["iops"]
+            pruned["max"] = data["iops"]
+            pruned["stddev"] = 0
+
+    if op.unit == "files/s" or latency:
+        # per-operation latency in microseconds, only measured by fio if the
+        # job runs without `gtod_reduce`
+        for suffix in ["max", "mean", "min", "stddev"]:
+            pruned[f"lat_{suffix}"] = data["clat_ns"][suffix] / 1000
     return pruned
 
 
-def render_fio_config(op: Op, ramp_sec=5, run_sec=30, sync=0):
+def extract_window(result: Union[List, Dict]):
+    """
+    Returns start and end of the measured part of the fio job in `result` as
+    seconds since the epoch, or None if fio doesn't report them. fio stamps
+    its output when the job ends, and the ramp time isn't part of the job
+    runtime.
+    """
+    if isinstance(result, list):
+        result = result[0]
+    fio = result["Raw"]["result"]
+    job = fio["jobs"][0]
+    if "timestamp_ms" not in fio or "job_runtime" not in job:
+        return None
+    end = fio["timestamp_ms"] / 1000
+    return end - job["job_runtime"] / 1000, end
+
+
+def overlap(window, other):
+    """
+    Returns the fraction of `window` which is covered by `other`.
+    """
+    start, end = window
+    covered = min(end, other[1]) - max(start, other[0])
+    return max(covered, 0) / (end - start)
+
+
+RAMP_SEC = 5
+RUN_SEC = 30
+
+
+def render_fio_file_config(op: Op, nrfiles=2000, filesize="4k", dirs=4):
+    """
+    Render fio config for the metadata benchmarks using fio's file engines.
+    Each of the `dirs` jobs operates on `nrfiles` small files in its own
+    directory. The files are removed after each run, so that `filecreate`
+    creates new files on an existing PVC instead of opening the ones left
+    by an earlier iteration. `filecreate` only creates the files when they
+    are opened during the run, instead of laying them out beforehand.
+    """
+    name = f"{op.value[0]}_{op.value[1]}"
+    engines = {
+        "create": "filecreate",
+        "stat": "filestat",
+        "delete": "filedelete",
+    }
+    if op.value[0] not in engines:
+        raise ValueError(f"Unknown Op: {op.name}, {op.value[0]}")
+    create_on_open = 1 if op.value[0] == "create" else 0
+
+    return textwrap.dedent(
+        f"""
+        [global]
+        randrepeat=0
+        verify=0
+        ioengine={engines[op.value[0]]}
+        fallocate=none
+        openfiles=1
+        create_on_open={create_on_open}
+        unlink=1
+        group_reporting=1
+        [job]
+        name={name}
+        numjobs={dirs}
+        nrfiles={nrfiles}
+        filesize={filesize}
+        filename_format=tree.$jobnum/f.$filenum
+        """
+    ).strip()
+
+
+def render_fio_config(
+    op: Op,
+    ramp_sec=RAMP_SEC,
+    run_sec=RUN_SEC,
+    sync=0,
+    sequential=False,
+    ioengine="libaio",
+    direct=1,
+    gtod_reduce=1,
+    nrfiles=2000,
+    filesize="4k",
+    dirs=4,
+):
+    if op.unit == "files/s":
+        return render_fio_file_config(op, nrfiles=nrfiles, filesize=filesize, dirs=dirs)
+
     name = f"{op.value[0]}_{op.value[1]}"
 
-    if op.value[0] == "read":
-        rw = "randread"
-    elif op.value[0] == "write":
-        rw = "randwrite"
+    if op.value[0] in ["read", "write"]:
+        rw = op.value[0]
+        if not sequential:
+            rw = f"rand{rw}"
     else:
         raise ValueError(f"Unknown Op: {op.name}, {op.value[0]}")
 
@@ -95,9 +224,9 @@ def render_fio_config(op: Op, ramp_sec=5, run_sec=30, sync=0):
         [global]
         randrepeat=0
         verify=0
-        ioengine=libaio
-        direct=1
-        gtod_reduce=1
+        ioengine={ioengine}
+        direct={direct}
+        gtod_reduce={gtod_reduce}
         [job]
         name={name}
         bs={blocksize}
@@ -165,15 +294,82 @@ BENCHMARKS = {
             "sync": 128,
         },
     },
+    "file_create": {
+        "fio_op": Op.FILE_CREATE,
+        "params": {},
+    },
+    "file_stat": {
+        "fio_op": Op.FILE_STAT,
+        "params": {},
+    },
+    "file_delete": {
+        "fio_op": Op.FILE_DELETE,
+        "params": {},
+    },
+}
+
+IOENGINES = ["libaio", "io_uring", "psync"]
+
+
+def expand_matrix(items, ioengines=["libaio"], directs=[1]):
+    """
+    Expand each benchmark in `items` across all combinations of I/O engine
+    and `direct` setting. File operation benchmarks don't use an I/O engine
+    and are passed through unchanged.
+    """
+    expanded = []
+    for benchname, bench in items:
+        if bench["fio_op"].unit == "files/s":
+            expanded.append((benchname, bench))
+            continue
+        for ioengine in ioengines:
+            for direct in directs:
+                params = {**bench["params"], "ioengine": ioengine, "direct": direct}
+                expanded.append((benchname, {**bench, "params": params}))
+    return expanded
+
+
+def matrix_label(bench):
+    params = bench["params"]
+    if "ioengine" not in params:
+        return ""
+    return f" ({params['ioengine']}, direct={params['direct']})"
+
+
+# Background workloads for the interference mode. Aggressors run on their own
+# PVC of the benchmarked storage class, concurrently to the benchmark.
+AGGRESSORS = {
+    "seq_write_flood": {
+        "fio_op": Op.WRITE_BW,
+        "params": {
+            "sequential": True,
+        },
+    },
+    "seq_read_flood": {
+        "fio_op": Op.READ_BW,
+        "params": {
+            "sequential": True,
+        },
+    },
+    "rand_read_storm": {
+        "fio_op": Op.READ_IOPS,
+        "params": {},
+    },
+    "rand_write_storm": {
+        "fio_op": Op.WRITE_IOPS,
+        "params": {},
+    },
 }
 
 
-def run_kubestr(storage_class: str, fio_config: str, existing_pvc=None, namespace=None):
+def run_kubestr(
+    storage_class: str, fio_config: str, existing_pvc=None, namespace=None, kubestr="kubestr"
+):
     tmpf = tempfile.NamedTemporaryFile(delete=False)
     tmpf.write(fio_config.encode("utf-8"))
     tmpf.close()
     kubestr_cmd = [
-        "kubestr",
+        kubestr,
         "fio",
         "-s",
         storage_class,
@@ -217,8 +413,9 @@ def run_benchmark(
     verbose=False,
     existing_pvc=None,
     namespace=None,
+    kubestr="kubestr",
 ):
-    print(f"Running {benchname} benchmark", file=sys.stderr)
+    print(f"Running {benchname}{matrix_label(bench)} benchmark", file=sys.stderr)
     op = bench["fio_op"]
     fio_config = render_fio_config(op, **bench["params"])
     results = []
@@ -227,10 +424,16 @@ def run_benchmark(
     while i < iters:
         try:
             print(f"Executing iteration {i+1}", file=sys.stderr)
+            started = datetime.now().isoformat()
             result = run_kubestr(
-                storageclass, fio_config, existing_pvc=existing_pvc, namespace=namespace
+                storageclass,
+                fio_config,
+                existing_pvc=existing_pvc,
+                namespace=namespace,
+                kubestr=kubestr,
             )
             data = extract_results(op, result)
+            data["timestamp"] = started
             if verbose:
                 pp.pprint(data)
             results.append(data)
@@ -248,20 +451,209 @@ def run_benchmark(
                 i = i + 1
                 retry = 0
 
-    mean_of_means = statistics.mean([r["mean"] for r in results])
-    if len(results) > 1:
-        stdev_of_means = statistics.stdev([r["mean"] for r in results])
+    if len(results) > 0:
+        mean_of_means = statistics.mean([r["mean"] for r in results])
+        if len(results) > 1:
+            stdev_of_means = statistics.stdev([r["mean"] for r in results])
+        else:
+            stdev_of_means = 0
+        unit = op.unit
+        print(f"Mean {mean_of_means:.2f}{unit} +- {stdev_of_means:.2f}{unit}")
     else:
-        stdev_of_means = 0
-    unit = op.unit
-    print(f"Mean {mean_of_means:.2f}{unit} +- {stdev_of_means:.2f}{unit}")
+        print(f"No successful iterations for {benchname}")
 
-    return {
+    r = {
         "name": benchname,
-        "storageclass": sc,
+        "storageclass": storageclass,
         "iterations": iters,
         "results": results,
     }
+    if "ioengine" in bench["params"]:
+        r["ioengine"] = bench["params"]["ioengine"]
+        r["direct"] = bench["params"]["direct"]
+    return r
+
+
+def run_interference(
+    benchname,
+    bench,
+    aggressorname,
+    aggressor,
+    storageclass,
+    iters=5,
+    verbose=False,
+    existing_pvc=None,
+    namespace=None,
+    kubestr="kubestr",
+    warmup_sec=60,
+    min_overlap=0.95,
+):
+    """
+    Run benchmark `benchname` once in isolation and once while the aggressor
+    workload runs on a separate PVC of the same storage class, for each
+    iteration. The aggressor is started `warmup_sec` seconds before the
+    benchmark to give kubestr time to provision its PVC and pod.
+
+    The benchmark runs without `gtod_reduce`, so that fio measures the
+    latency in addition to IOPS or bandwidth. Iterations in which the
+    aggressor didn't run for at least `min_overlap` of the benchmark's
+    measured time are retried, as they would underestimate the slowdown.
+    """
+    print(
+        f"Running {benchname}{matrix_label(bench)} benchmark under {aggressorname}",
+        file=sys.stderr,
+    )
+    op = bench["fio_op"]
+    fio_config = render_fio_config(op, **{**bench["params"], "gtod_reduce": 0})
+    aggressor_op = aggressor["fio_op"]
+    baseline = []
+    results = []
+    aggressor_results = []
+    i = 0
+    retry = 0
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        while i < iters:
+            aggressor_future = None
+            try:
+                print(f"Executing isolated iteration {i+1}", file=sys.stderr)
+                isolated_started = datetime.now().isoformat()
+                isolated_start = time.monotonic()
+                isolated = extract_results(
+                    op,
+                    run_kubestr(
+                        storageclass,
+                        fio_config,
+                        existing_pvc=existing_pvc,
+                        namespace=namespace,
+                        kubestr=kubestr,
+                    ),
+                    latency=True,
+                )
+                isolated_sec = math.ceil(time.monotonic() - isolated_start)
+                # Keep the aggressor running while the benchmark's PVC and pod
+                # are provisioned, and for the full benchmark runtime. Both
+                # take longer under the aggressor than in isolation.
+                aggressor_config = render_fio_config(
+                    aggressor_op,
+                    run_sec=warmup_sec + 2 * max(isolated_sec, RAMP_SEC + RUN_SEC),
+                    **aggressor["params"],
+                )
+                print(f"Executing iteration {i+1} under {aggressorname}", file=sys.stderr)
+                aggressor_future = executor.submit(
+                    run_kubestr,
+                    storageclass,
+                    aggressor_config,
+                    namespace=namespace,
+                    kubestr=kubestr,
+                )
+                time.sleep(warmup_sec)
+                started = datetime.now().isoformat()
+                result = run_kubestr(
+                    storageclass,
+                    fio_config,
+                    existing_pvc=existing_pvc,
+                    namespace=namespace,
+                    kubestr=kubestr,
+                )
+                data = extract_results(op, result, latency=True)
+                aggressor_result = aggressor_future.result()
+                aggressor_data = extract_results(aggressor_op, aggressor_result)
+                window = extract_window(result)
+                aggressor_window = extract_window(aggressor_result)
+                if window is not None and aggressor_window is not None:
+                    data["aggressor_overlap"] = overlap(window, aggressor_window)
+                    if data["aggressor_overlap"] < min_overlap:
+                        raise Exception(
+                            f"{aggressorname} only ran during "
+                            + f"{data['aggressor_overlap'] * 100:.0f}% of the benchmark"
+                        )
+                else:
+                    print("fio didn't report job times, unable to check aggressor overlap")
+                isolated["timestamp"] = isolated_started
+                data["timestamp"] = started
+                if verbose:
+                    pp.pprint(
+                        {"isolated": isolated, "interfered": data, "aggressor": aggressor_data}
+                    )
+                baseline.append(isolated)
+                results.append(data)
+                aggressor_results.append(aggressor_data)
+                i = i + 1
+                retry = 0
+                time.sleep(5)
+            except Exception as e:
+                print(f"Error during iteration {i}:")
+                print(e)
+                if aggressor_future is not None:
+                    # Don't overlap the next attempt with a leftover aggressor
+                    wait([aggressor_future])
+                if retry < 3:
+                    print("Retrying iteration")
+                    retry = retry + 1
+                else:
+                    print(f"Giving up on iteration {i} after {retry} tries")
+                    i = i + 1
+                    retry = 0
+
+    if len(results) > 0:
+        slowdown = statistics.mean([r["mean"] for r in baseline]) / statistics.mean(
+            [r["mean"] for r in results]
+        )
+        print(f"Slowdown under {aggressorname}: {slowdown:.2f}x")
+        baseline_lat = statistics.mean([r["lat_mean"] for r in baseline])
+        if baseline_lat > 0:
+            lat_slowdown = statistics.mean([r["lat_mean"] for r in results]) / baseline_lat
+            print(f"Latency increase under {aggressorname}: {lat_slowdown:.2f}x")
+    else:
+        print(f"No successful iterations for {benchname} under {aggressorname}")
+
+    r = {
+        "name": benchname,
+        "storageclass": storageclass,
+        "iterations": iters,
+        "results": results,
+        "baseline": baseline,
+        "aggressor": aggressorname,
+        "aggressor_results": aggressor_results,
+    }
+    if "ioengine" in bench["params"]:
+        r["ioengine"] = bench["params"]["ioengine"]
+        r["direct"] = bench["params"]["direct"]
+    return r
+
+
+def interleaved_schedule(pairs, iters, seed=None):
+    """
+    Returns the order in which to run the iterations of `pairs`. The schedule
+    consists of `iters` rounds, each of which contains every pair once in
+    random order. This spreads drift in cluster load over time evenly across
+    the pairs.
+    """
+    rng = random.Random(seed)
+    schedule = []
+    for _ in range(iters):
+        block = list(pairs)
+        rng.shuffle(block)
+        schedule.extend(block)
+    return schedule
+
+
+def merge_results(merged, r):
+    """
+    Merge the results of single iteration run `r` into `merged`.
+    """
+    if merged is None:
+        return r
+    for k in ["results", "baseline", "aggressor_results"]:
+        if k in r:
+            merged[k].extend(r[k])
+    return merged
+
+
+def save_results(filename, results):
+    print("Updating results file")
+    with open(f"{filename}.json", "w") as resf:
+        json.dump(results, resf)
 
 
 if __name__ == "__main__":
@@ -338,38 +730,192 @@ if __name__ == "__main__":
         help="Namespace in which to run the benchmark."
         + " Defaults to the value of environment variable BENCH_NAMESPACE.",
     )
+    parser.add_argument(
+        "-k",
+        "--kubestr",
+        default=os.environ.get("KUBESTR", "kubestr"),
+        help="kubestr executable to use, e.g. `./replay.py` to replay recorded results."
+        + " Defaults to the value of environment variable KUBESTR.",
+    )
+    aggressor_default = None
+    if "AGGRESSORS" in os.environ:
+        aggressor_default = os.environ["AGGRESSORS"].split(",")
+    parser.add_argument(
+        "-a",
+        "--aggressor",
+        choices=AGGRESSORS.keys(),
+        action="append",
+        help="Run the benchmarks in interference mode with the selected background workload(s)"
+        + " on a separate PVC of the same storage class. Can be repeated."
+        + " Each iteration is also run in isolation as baseline."
+        + " Defaults to the value of environment variable AGGRESSORS."
+        + " Multiple values can be separated by commas in the environment variable.",
+        default=aggressor_default,
+    )
+    default_warmup = 60
+    try:
+        default_warmup = int(os.environ.get("AGGRESSOR_WARMUP", "60"))
+    except:
+        print("Unable to parse value of environment variable AGGRESSOR_WARMUP as int, ignoring it")
+    parser.add_argument(
+        "--aggressor-warmup",
+        type=int,
+        default=default_warmup,
+        help="Seconds between starting the aggressor and starting the benchmark in interference"
+        + " mode. Defaults to the value of environment variable AGGRESSOR_WARMUP.",
+    )
+    engine_default = None
+    if "BENCH_ENGINES" in os.environ:
+        engine_default = os.environ["BENCH_ENGINES"].split(",")
+    parser.add_argument(
+        "-E",
+        "--engine",
+        choices=IOENGINES,
+        action="append",
+        help="Run each selected benchmark with the given fio I/O engine(s). Can be repeated."
+        + " Defaults to the value of environment variable BENCH_ENGINES."
+        + " Multiple values can be separated by commas in the environment variable."
+        + " If neither engines nor direct settings are given, benchmarks use libaio with"
+        + " direct=1.",
+        default=engine_default,
+    )
+    direct_default = None
+    if "BENCH_DIRECT" in os.environ:
+        direct_default = os.environ["BENCH_DIRECT"].split(",")
+    parser.add_argument(
+        "-D",
+        "--direct",
+        type=int,
+        choices=[0, 1],
+        action="append",
+        help="Run each selected benchmark with the given fio direct setting(s), 0 for buffered"
+        + " I/O through the page cache and 1 for direct I/O. Can be repeated."
+        + " Defaults to the value of environment variable BENCH_DIRECT."
+        + " Multiple values can be separated by commas in the environment variable.",
+        default=direct_default,
+    )
+    parser.add_argument(
+        "--schedule",
+        choices=["sequential", "interleaved"],
+        default=os.environ.get("BENCH_SCHEDULE", "sequential"),
+        help="Order in which iterations are run. 'sequential' runs all iterations of a"
+        + " benchmark,storage class pair before moving to the next pair. 'interleaved' runs"
+        + " one iteration of each pair per round, in random order, to spread drift in"
+        + " cluster load evenly across pairs."
+        + " Defaults to the value of environment variable BENCH_SCHEDULE.",
+    )
+    seed_default = None
+    try:
+        if "BENCH_SEED" in os.environ:
+            seed_default = int(os.environ["BENCH_SEED"])
+    except:
+        print("Unable to parse value of environment variable BENCH_SEED as int, ignoring it")
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=seed_default,
+        help="Seed for the interleaved schedule. Random if omitted."
+        + " Defaults to the value of environment variable BENCH_SEED.",
+    )
     args = parser.parse_args()
 
     if args.storage_class is None or len(args.storage_class) == 0:
         parser.print_help()
         sys.exit(1)
+    # argparse doesn't check defaults from the environment against the choices
+    if args.engine is not None:
+        for e in args.engine:
+            if e not in IOENGINES:
+                parser.error(
+                    f"invalid I/O engine '{e}' in environment variable BENCH_ENGINES"
+                    + f" (choose from {', '.join(IOENGINES)})"
+                )
+    if args.direct is not None:
+        for d in args.direct:
+            if str(d) not in ["0", "1"]:
+                parser.error(
+                    f"invalid direct setting '{d}' in environment variable BENCH_DIRECT"
+                    + " (choose from 0, 1)"
+                )
+        args.direct = [int(d) for d in args.direct]
 
     timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
     filename = f"{args.output_directory}/results_{timestamp}"
 
-    results = []
-    for sc in args.storage_class:
-        print(f"Running benchmarks for storage class {sc}")
+    items = []
+    if args.benchmark is not None:
+        for b in args.benchmark:
+            items.append((b, BENCHMARKS[b]))
+    else:
+        items = BENCHMARKS.items()
+    if args.engine is not None or args.direct is not None:
+        items = expand_matrix(
+            items,
+            ioengines=args.engine or ["libaio"],
+            directs=args.direct or [1],
+        )
+    items = list(items)
 
-        items = []
-        if args.benchmark is not None:
-            for b in args.benchmark:
-                items.append((b, BENCHMARKS[b]))
-        else:
-            items = BENCHMARKS.items()
+    aggressors = [None]
+    if args.aggressor is not None:
+        aggressors = args.aggressor
 
-        for benchname, bench in items:
-            r = run_benchmark(
+    def _run(sc, n, aggressorname, iters):
+        benchname, bench = items[n]
+        if aggressorname is None:
+            return run_benchmark(
                 benchname,
                 bench,
                 sc,
-                iters=args.iterations,
+                iters=iters,
                 verbose=args.verbose,
                 existing_pvc=args.existing_pvc,
                 namespace=args.namespace,
+                kubestr=args.kubestr,
             )
-            results.append(r)
+        return run_interference(
+            benchname,
+            bench,
+            aggressorname,
+            AGGRESSORS[aggressorname],
+            sc,
+            iters=iters,
+            verbose=args.verbose,
+            existing_pvc=args.existing_pvc,
+            namespace=args.namespace,
+            kubestr=args.kubestr,
+            warmup_sec=args.aggressor_warmup,
+        )
+
+    # Benchmarks are referenced by their index in `items`, as the engine matrix
+    # can expand a benchmark name into multiple items.
+    pairs = [
+        (sc, n, a) for sc in args.storage_class for n in range(len(items)) for a in aggressors
+    ]
 
-            print("Updating results file")
-            with open(f"{filename}.json", "w") as resf:
-                json.dump(results, resf)
+    def _describe(sc, n):
+        benchname, bench = items[n]
+        return f"benchmark {benchname}{matrix_label(bench)} for storage class {sc}"
+
+    results = []
+    if args.schedule == "sequential":
+        for sc, n, aggressorname in pairs:
+            print(f"Running {_describe(sc, n)}")
+            results.append(_run(sc, n, aggressorname, args.iterations))
+            save_results(filename, results)
+    else:
+        seed = args.seed
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        print(f"Running interleaved schedule with seed {seed}")
+        merged = {p: None for p in pairs}
+        schedule = interleaved_schedule(pairs, args.iterations, seed=seed)
+        for idx, pair in enumerate(schedule):
+            sc, n, aggressorname = pair
+            print(f"Running {_describe(sc, n)}, {idx+1}/{len(schedule)}")
+            merged[pair] = merge_results(merged[pair], _run(sc, n, aggressorname, 1))
+            # Record the requested iterations as in the sequential schedule
+            results = [
+                {**r, "iterations": args.iterations} for r in merged.values() if r is not None
+            ]
+            save_results(filename, results)
@@ -6,6 +6,8 @@ import numpy
 import statistics
 import sys
 
+from datetime import datetime
+
 import humanize
 
 
@@ -14,19 +16,50 @@ class BenchData:
         self._op = result["name"]
         self._storageclass = result["storageclass"]
         self._iterations = result["iterations"]
-        self._means = numpy.empty(self.iterations)
-        self._stddevs = numpy.empty(self.iterations)
-        self._mins = numpy.empty(self.iterations)
-        self._maxs = numpy.empty(self.iterations)
+        # Iterations which failed are missing from the results, so there may
+        # be fewer results than iterations.
+        count = len(result["results"])
+        self._means = numpy.empty(count)
+        self._stddevs = numpy.empty(count)
+        self._mins = numpy.empty(count)
+        self._maxs = numpy.empty(count)
+        # Only present for file operation benchmarks
+        self._lat_means = numpy.empty(count)
         for i, d in enumerate(result["results"]):
             self._means[i] = d["mean"]
             self._stddevs[i] = d["stddev"]
             self._mins[i] = d["min"]
             self._maxs[i] = d["max"]
+            self._lat_means[i] = d.get("lat_mean", numpy.nan)
+        # Start time of each iteration, not present in older results files
+        self._timestamps = [
+            datetime.fromisoformat(d["timestamp"]) for d in result["results"] if "timestamp" in d
+        ]
+        # Only present for results of the engine matrix, older results and
+        # benchmarks run without the matrix use libaio with direct I/O.
+        self._matrix = "ioengine" in result
+        self._ioengine = result.get("ioengine", "libaio")
+        self._direct = result.get("direct", 1)
+        # Only present for results of the interference mode
+        self._aggressor = result.get("aggressor")
+        self._baseline_means = numpy.array([d["mean"] for d in result.get("baseline", [])])
+        self._baseline_lat_means = numpy.array(
+            [d.get("lat_mean", numpy.nan) for d in result.get("baseline", [])]
+        )
+        # Only present for results of the provisioning benchmarks
+        self._concurrency = result.get("concurrency", 1)
+        self._samples = numpy.array([x for d in result["results"] for x in d.get("samples", [])])
 
     @property
     def name(self):
-        return f"{self.op}_{self.storageclass}"
+        if self.op.startswith("provision_"):
+            return f"{self.op}_{self.storageclass}_x{self.concurrency}"
+        name = f"{self.op}_{self.storageclass}"
+        if self.matrix:
+            name = f"{name}_{self.ioengine}_direct{self.direct}"
+        if self.aggressor is not None:
+            name = f"{name}_{self.aggressor}"
+        return name
 
     @property
     def op(self):
@@ -52,12 +85,88 @@ class BenchData:
     def stddevs(self):
         return self._stddevs
 
+    @property
+    def lat_means(self):
+        """
+        Mean latency of file operations in microseconds.
+        """
+        return self._lat_means
+
     @property
     def iterations(self):
         return self._iterations
 
+    @property
+    def matrix(self):
+        """
+        Whether the result was produced by the engine matrix.
+        """
+        return self._matrix
+
+    @property
+    def ioengine(self):
+        return self._ioengine
+
+    @property
+    def direct(self):
+        return self._direct
+
+    @property
+    def timestamps(self):
+        return self._timestamps
+
+    @property
+    def concurrency(self):
+        return self._concurrency
+
+    @property
+    def samples(self):
+        """
+        Latencies of all individual volumes of the provisioning benchmarks.
+        """
+        return self._samples
+
+    @property
+    def aggressor(self):
+        return self._aggressor
+
+    @property
+    def baseline_means(self):
+        return self._baseline_means
+
+    @property
+    def slowdown(self):
+        """
+        Factor by which the isolated baseline outperforms the results measured
+        under the aggressor workload.
+        """
+        if self.aggressor is None:
+            raise ValueError(f"No aggressor for {self.name}")
+        return statistics.mean(self.baseline_means) / statistics.mean(self.means)
+
+    @property
+    def baseline_lat_means(self):
+        return self._baseline_lat_means
+
+    @property
+    def lat_slowdown(self):
+        """
+        Factor by which the latency measured under the aggressor workload
+        exceeds the isolated baseline. None for results without latencies.
+        """
+        if self.aggressor is None:
+            raise ValueError(f"No aggressor for {self.name}")
+        baseline_lat = numpy.mean(self.baseline_lat_means)
+        if numpy.isnan(baseline_lat) or baseline_lat <= 0:
+            return None
+        return numpy.mean(self.lat_means) / baseline_lat
+
     @property
     def unit(self):
+        if self.op.startswith("provision_"):
+            return "s"
+        if self.op.startswith("file_"):
+            return "files/s"
         if "iops" in self.op:
             return "IOPS"
         if "bw" in self.op:
@@ -66,6 +175,12 @@ class BenchData:
 
     @property
     def type(self):
+        if self.op.startswith("provision_"):
+            # bind or attach
+            return self.op.split("_")[-1]
+        if self.op.startswith("file_"):
+            # create, stat or delete
+            return self.op[len("file_") :]
         if "write" in self.op:
             return "write"
         if "read" in self.op:
@@ -77,7 +192,11 @@ class BenchData:
         """
         Compute next "round" number for magnitude of number, e.g. 50000 for 48745
         """
-        ymax = numpy.max(self.maxs)
+        # keep the isolated baseline of interference results in view
+        values = numpy.concatenate([self.maxs, self.baseline_means])
+        if len(values) == 0 or numpy.max(values) <= 0:
+            return 1
+        ymax = numpy.max(values)
         ylim_floor = 10 ** math.floor(math.log(ymax, 10))
         return math.ceil(ymax / ylim_floor) * ylim_floor
 
@@ -107,7 +226,17 @@ class BenchData:
             mean_of_means = f"{mean_of_means:.2f}{unit}"
             stdev_of_means = f"{stdev_of_means:.2f}{unit}"
 
-        return f"Mean {mean_of_means} +- {stdev_of_means}"
+        info = f"Mean {mean_of_means} +- {stdev_of_means}"
+        if unit == "files/s":
+            info = f"{info}, mean latency {statistics.mean(self.lat_means):.2f}us"
+        if len(self.samples) > 0:
+            p50, p95, p99 = numpy.percentile(self.samples, [50, 95, 99])
+            info = f"{info}, p50 {p50:.2f}{unit}, p95 {p95:.2f}{unit}, p99 {p99:.2f}{unit}"
+        if self.aggressor is not None:
+            info = f"{info}, slowdown under {self.aggressor}: {self.slowdown:.2f}x"
+            if self.lat_slowdown is not None:
+                info = f"{info}, latency {self.lat_slowdown:.2f}x"
+        return info
 
 
 if __name__ == "__main__":
@@ -124,6 +253,13 @@ if __name__ == "__main__":
         results = [BenchData(r) for r in json.load(resf)]
 
     for r in results:
+        if len(r.means) == 0:
+            print(f"No successful iterations for {r.op} on {r.storageclass}, skipping")
+            continue
         print(f"StorageClass: {r.storageclass}")
         print(f"Benchmark: {r.op}")
+        if r.op.startswith("provision_"):
+            print(f"Concurrency: {r.concurrency}")
+        if r.matrix:
+            print(f"I/O engine: {r.ioengine}, direct={r.direct}")
         print(r.info())
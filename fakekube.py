@@ -0,0 +1,221 @@
+#!/usr/bin/env python3.8
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Objects are stored as JSON files in this directory, so that state is kept
+# across invocations.
+STATE_DIR = os.environ.get("FAKEKUBE_STATE", os.path.join(tempfile.gettempdir(), "fakekube"))
+
+KINDS = {
+    "PersistentVolumeClaim": "pvc",
+    "Pod": "pod",
+}
+
+KIND_ALIASES = {
+    "pvc": "pvc",
+    "persistentvolumeclaim": "pvc",
+    "persistentvolumeclaims": "pvc",
+    "pod": "pod",
+    "pods": "pod",
+}
+
+
+def _delay(name, default):
+    """
+    Read delay from environment variable `name` and apply the configured jitter.
+    """
+    delay = float(os.environ.get(name, default))
+    jitter = float(os.environ.get("FAKEKUBE_JITTER", "0.2"))
+    return delay * (1 + random.uniform(-jitter, jitter))
+
+
+def _path(namespace, kind, name):
+    return os.path.join(STATE_DIR, f"{namespace}_{kind}_{name}.json")
+
+
+def _load(namespace, kind, name):
+    try:
+        with open(_path(namespace, kind, name)) as objf:
+            return json.load(objf)
+    except FileNotFoundError:
+        return None
+
+
+def _pending_pvcs(namespace, now):
+    pending = 0
+    for fname in os.listdir(STATE_DIR):
+        if not fname.startswith(f"{namespace}_pvc_") or not fname.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(STATE_DIR, fname)) as objf:
+                pvc = json.load(objf)
+        except FileNotFoundError:
+            # deleted concurrently
+            continue
+        if pvc["fakekube"]["bound"] > now:
+            pending = pending + 1
+    return pending
+
+
+def create(namespace, obj):
+    """
+    Store `obj` and precompute the time at which it becomes bound (PVCs) or
+    ready (pods). Every PVC which is still pending adds FAKEKUBE_QUEUE_DELAY
+    to the bind time, to emulate a provisioner which handles requests one at
+    a time.
+    """
+    kind = KINDS[obj["kind"]]
+    name = obj["metadata"]["name"]
+    if _load(namespace, kind, name) is not None:
+        print(
+            f'Error from server (AlreadyExists): {obj["kind"]} "{name}" already exists',
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    now = time.time()
+    obj["metadata"]["namespace"] = namespace
+    if kind == "pvc":
+        bind_delay = _delay("FAKEKUBE_BIND_DELAY", "1")
+        if "dataSource" in obj["spec"]:
+            bind_delay = bind_delay + _delay("FAKEKUBE_RESTORE_DELAY", "3")
+        bind_delay = bind_delay + _pending_pvcs(namespace, now) * float(
+            os.environ.get("FAKEKUBE_QUEUE_DELAY", "0")
+        )
+        bound = now + bind_delay
+        storageclasses = os.environ.get("FAKEKUBE_STORAGECLASSES")
+        if storageclasses is not None:
+            if obj["spec"].get("storageClassName") not in storageclasses.split(","):
+                # unknown storage classes never get bound
+                bound = float("inf")
+        obj["fakekube"] = {"bound": bound}
+    else:
+        obj["fakekube"] = {"created": now, "attach_delay": _delay("FAKEKUBE_ATTACH_DELAY", "2")}
+
+    # write atomically, concurrent invocations may read the object
+    path = _path(namespace, kind, name)
+    with open(f"{path}.tmp", "w") as objf:
+        json.dump(obj, objf)
+    os.replace(f"{path}.tmp", path)
+    print(f"{obj['kind'].lower()}/{name} created")
+
+
+def _done_at(namespace, kind, obj):
+    """
+    Return the time at which PVC `obj` is bound or pod `obj` is ready.
+    """
+    fake = obj["fakekube"]
+    if kind == "pvc":
+        return fake["bound"]
+    claim = obj["spec"]["volumes"][0]["persistentVolumeClaim"]["claimName"]
+    pvc = _load(namespace, "pvc", claim)
+    if pvc is None:
+        # pods never get ready without their PVC
+        return float("inf")
+    return max(fake["created"], pvc["fakekube"]["bound"]) + fake["attach_delay"]
+
+
+def _not_found(kind, name):
+    print(f'Error from server (NotFound): {kind} "{name}" not found', file=sys.stderr)
+    sys.exit(1)
+
+
+def get(namespace, kind, name):
+    obj = _load(namespace, kind, name)
+    if obj is None:
+        _not_found(kind, name)
+
+    ready = _done_at(namespace, kind, obj) <= time.time()
+    obj.pop("fakekube")
+    if kind == "pvc":
+        obj["status"] = {"phase": "Bound" if ready else "Pending"}
+    else:
+        obj["status"] = {
+            "phase": "Running" if ready else "Pending",
+            "conditions": [{"type": "Ready", "status": "True" if ready else "False"}],
+        }
+    print(json.dumps(obj, indent=2))
+
+
+def wait(namespace, kind, name, timeout_sec):
+    """
+    Block until the PVC is bound or the pod is ready, like `kubectl wait`.
+    Sleeps until the precomputed time instead of polling, the bind time of a
+    pod's PVC is rechecked periodically as it may not exist yet.
+    """
+    deadline = time.time() + timeout_sec
+    while True:
+        obj = _load(namespace, kind, name)
+        if obj is None:
+            _not_found(kind, name)
+        now = time.time()
+        done = _done_at(namespace, kind, obj)
+        if done <= now:
+            print(f"{kind}/{name} condition met")
+            return
+        if min(done, deadline) <= now:
+            print(f"error: timed out waiting for the condition on {kind}/{name}", file=sys.stderr)
+            sys.exit(1)
+        time.sleep(min(done, deadline, now + 0.1) - now)
+
+
+def delete(namespace, kind, name, ignore_not_found=False):
+    try:
+        os.unlink(_path(namespace, kind, name))
+    except FileNotFoundError:
+        if ignore_not_found:
+            return
+        _not_found(kind, name)
+    print(f'{kind} "{name}" deleted')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fake kubectl which emulates PVC binding and pod attach with configurable"
+        + " delays. Supports the subset of kubectl used by `provision.py`. The fake cluster"
+        + " is configured through environment variables FAKEKUBE_STATE, FAKEKUBE_BIND_DELAY,"
+        + " FAKEKUBE_ATTACH_DELAY, FAKEKUBE_RESTORE_DELAY, FAKEKUBE_QUEUE_DELAY,"
+        + " FAKEKUBE_JITTER and FAKEKUBE_STORAGECLASSES."
+    )
+    parser.add_argument("verb", choices=["create", "get", "wait", "delete"])
+    parser.add_argument("kind", nargs="?")
+    parser.add_argument("name", nargs="?")
+    parser.add_argument("-n", "--namespace", default="default")
+    parser.add_argument("-f", "--filename")
+    parser.add_argument("-o", "--output")
+    parser.add_argument("--ignore-not-found", action="store_true")
+    # The condition is implied by the kind: PVCs are waited on until they're
+    # bound, pods until they're ready.
+    parser.add_argument("--for", dest="condition")
+    parser.add_argument("--timeout", default="30s")
+    args = parser.parse_intermixed_args()
+
+    if args.kind is not None and "/" in args.kind and args.name is None:
+        args.kind, args.name = args.kind.split("/", 1)
+
+    os.makedirs(STATE_DIR, exist_ok=True)
+
+    if args.verb == "create":
+        if args.filename == "-":
+            create(args.namespace, json.load(sys.stdin))
+        else:
+            with open(args.filename) as objf:
+                create(args.namespace, json.load(objf))
+        sys.exit(0)
+
+    if args.kind not in KIND_ALIASES or args.name is None:
+        print(f"error: unsupported resource {args.kind} {args.name}", file=sys.stderr)
+        sys.exit(1)
+    kind = KIND_ALIASES[args.kind]
+    if args.verb == "get":
+        get(args.namespace, kind, args.name)
+    elif args.verb == "wait":
+        wait(args.namespace, kind, args.name, float(args.timeout.rstrip("s")))
+    else:
+        delete(args.namespace, kind, args.name, ignore_not_found=args.ignore_not_found)
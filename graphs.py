@@ -1,3 +1,5 @@
+import itertools
+
 from collections import UserDict
 
 import humanize
@@ -34,18 +36,69 @@ class Benchmarks(UserDict):
                 "read": [],
                 "write": [],
             },
+            "files/s": {
+                "create": [],
+                "stat": [],
+                "delete": [],
+            },
+            "s": {
+                "bind": [],
+                "attach": [],
+            },
         }
+        # Results of the interference mode are kept out of the comparison
+        # plots and are plotted as slowdown factors instead.
+        self.interference = []
         self._storageclasses = set()
 
     def __setitem__(self, k, v):
-        self.data_by_type[v.unit][v.type].append(v)
+        if v.aggressor is not None:
+            self.interference.append(v)
+        else:
+            self.data_by_type[v.unit][v.type].append(v)
         return super(Benchmarks, self).__setitem__(k, v)
 
     def __delitem__(self, k):
         v = self.data[k]
-        self.data_by_type[v.unit][v.type].remove(v)
+        if v.aggressor is not None:
+            self.interference.remove(v)
+        else:
+            self.data_by_type[v.unit][v.type].remove(v)
         return super(Benchmarks, self).__delitem__(k)
 
+    def matrix(self, sc, unit):
+        """
+        Returns mean of means for the engine matrix results of storage class
+        `sc`, as dict mapping benchmark to dict mapping (ioengine, direct) to
+        the mean.
+        """
+        matrix = {}
+        for d in self.data.values():
+            if d.matrix and d.aggressor is None and d.storageclass == sc and d.unit == unit:
+                matrix.setdefault(d.op, {})[(d.ioengine, d.direct)] = statistics.mean(d.means)
+        return matrix
+
+    def slowdowns(self, sc):
+        """
+        Returns labels, slowdown factors and latency slowdown factors of all
+        interference results for storage class `sc`. The latency slowdown is
+        None for results without latencies.
+        """
+        labels = []
+        slowdowns = []
+        lat_slowdowns = []
+        for d in self.interference:
+            if d.storageclass == sc:
+                label = f"{d.op} / {d.aggressor}"
+                if d.matrix:
+                    label = f"{label} / {d.ioengine}"
+                    if d.direct == 0:
+                        label = f"{label}, buffered"
+                labels.append(label)
+                slowdowns.append(d.slowdown)
+                lat_slowdowns.append(d.lat_slowdown)
+        return labels, slowdowns, lat_slowdowns
+
     @staticmethod
     def _include_series(d, fsync=-1, sc=None):
         if sc is not None:
@@ -70,6 +123,19 @@ class Benchmarks(UserDict):
             if sc is None:
                 label = f"{d.storageclass} / {label}"
 
+        if d.aggressor is not None:
+            label = f"{label} / {d.aggressor}"
+
+        if d.matrix:
+            label = f"{label} / {d.ioengine}"
+            if d.direct == 0:
+                label = f"{label}, buffered"
+
+        if d.unit == "s":
+            if d.op.startswith("provision_restore_"):
+                label = f"{label} / restore"
+            label = f"{label}, {d.concurrency} concurrent"
+
         if add_mean:
             m = statistics.mean(d.means)
             if d.unit == "KB/s":
@@ -84,15 +150,14 @@ class Benchmarks(UserDict):
                 m = f"{m:.1f} {unit}"
 
             label = f"{label}, mean={m}"
+            if d.unit == "files/s":
+                label = f"{label}, lat={statistics.mean(d.lat_means):.1f}us"
 
         return label
 
     def labels(self, typ, fsync=-1, sc=None, add_mean=False):
         datas = self.data_by_type[typ]
-        labels = {
-            "read": [],
-            "write": [],
-        }
+        labels = {k: [] for k in datas}
         for k, v in datas.items():
             for d in v:
                 assert d.type == k
@@ -118,10 +183,7 @@ class Benchmarks(UserDict):
 
     def ylims(self, typ, fsync=-1, sc=None):
         datas = self.data_by_type[typ]
-        ylims = {
-            "read": 0,
-            "write": 0,
-        }
+        ylims = {k: 0 for k in datas}
         for k, v in datas.items():
             for d in v:
                 assert d.type == k
@@ -159,6 +221,8 @@ def plot_sc(pdf, unit, sc, bench_data: Benchmarks):
     titleprefix = {
         "KB/s": "Bandwidth",
         "IOPS": "IOPS",
+        "files/s": "File operations",
+        "s": "Provisioning latency",
     }
     title = f"{titleprefix[unit]}, StorageClass {sc}"
 
@@ -166,16 +230,15 @@ def plot_sc(pdf, unit, sc, bench_data: Benchmarks):
 
 
 def plot_series(pdf, title, unit, labels, means, stddevs, ylims):
-    # Expects dict with keys "read", "write" for labels, means, stddevs, ylims, and values as lists
-    # for labels, means, stddevs, and numbers for ylims.
+    # Expects dict with keys "read", "write" (or "create", "stat", "delete" for file operations)
+    # for labels, means, stddevs, ylims, and values as lists for labels, means, stddevs, and
+    # numbers for ylims.
 
-    types = [typ for typ in ["read", "write"] if len(means[typ]) > 0]
+    types = [typ for typ in means if len(means[typ]) > 0]
     if len(types) == 0:
         print(f"No data for plot '{title}', skipping")
         return
 
-    iters = len(means[types[0]][0])
-    xs = range(1, iters + 1)
     fmts = ["o-", "v-", "^-", "<-", ">-", "s-", "p-", "*-", "+-", "x-", "d-", "h-", "8-"]
     typ_colors = {t: gen_colors(len(l) + 1, drop_high=True)[1:] for t, l in labels.items()}
 
@@ -186,10 +249,12 @@ def plot_series(pdf, title, unit, labels, means, stddevs, ylims):
             clean_title = clean_title.strip(", no fsync")
         colors = typ_colors[typ]
         plt.figure(figsize=FIGSIZE_LEGEND)
-        plt.xticks(xs)
+        # Series can have different lengths if iterations failed
+        plt.xticks(range(1, max(len(mean) for mean in means[typ]) + 1))
         for mean, stddev, label, fmt, color in zip(
-            means[typ], stddevs[typ], labels[typ], fmts, colors
+            means[typ], stddevs[typ], labels[typ], itertools.cycle(fmts), colors
         ):
+            xs = range(1, len(mean) + 1)
             plt.plot(xs, mean, fmt, label=label, color=color)
             plt.fill_between(xs, mean - stddev, mean + stddev, alpha=0.25, color=color)
 
@@ -204,10 +269,134 @@ def plot_series(pdf, title, unit, labels, means, stddevs, ylims):
         plt.close()
 
 
+def plot_timeline(pdf, unit, bench_data: Benchmarks, interference=False):
+    """
+    Plot the mean of each iteration against the time at which the iteration
+    was started, to make drift in cluster load visible. With `interference`,
+    the results measured under aggressor workloads are plotted instead.
+    """
+    fmts = ["o-", "v-", "^-", "<-", ">-", "s-", "p-", "*-", "+-", "x-", "d-", "h-", "8-"]
+    for typ, datas in bench_data.data_by_type[unit].items():
+        if interference:
+            datas = [d for d in bench_data.interference if d.unit == unit and d.type == typ]
+        datas = [d for d in datas if len(d.timestamps) > 0]
+        if len(datas) == 0:
+            continue
+
+        colors = gen_colors(len(datas) + 1, drop_high=True)[1:]
+        plt.figure(figsize=FIGSIZE_LEGEND)
+        for d, fmt, color in zip(datas, itertools.cycle(fmts), colors):
+            # results are stored in order, so the first len(timestamps) means are measured
+            means = d.means[: len(d.timestamps)]
+            plt.plot(d.timestamps, means, fmt, label=Benchmarks._render_label(d), color=color)
+
+        ax = plt.gca()
+        ax.set_ylim(0, max(d.ylim for d in datas))
+        ax.legend(bbox_to_anchor=(0.5, -0.25), loc="upper center")
+        plt.gcf().autofmt_xdate()
+        plt.xlabel("Time")
+        plt.ylabel(unit)
+        plt.tight_layout()
+        title = f"{typ} {unit} over time"
+        if interference:
+            title = f"{title}, under aggressors"
+        plt.title(title)
+        pdf.savefig()
+        plt.close()
+
+
+def plot_matrix(pdf, sc, unit, bench_data: Benchmarks):
+    """
+    Plot side-by-side bars of the engine matrix results for each benchmark.
+    Each bar is annotated with the gain compared to libaio with direct I/O.
+    """
+    matrix = bench_data.matrix(sc, unit)
+    if len(matrix) == 0:
+        return
+
+    combos = sorted({c for means in matrix.values() for c in means})
+    ops = sorted(matrix.keys())
+    width = 0.8 / len(combos)
+    colors = gen_colors(len(combos) + 1)[1:]
+
+    plt.figure(figsize=FIGSIZE_LEGEND)
+    for i, (combo, color) in enumerate(zip(combos, colors)):
+        xs = [x + i * width for x in range(len(ops))]
+        ys = [matrix[op].get(combo, 0) for op in ops]
+        ioengine, direct = combo
+        label = ioengine
+        if direct == 0:
+            label = f"{label}, buffered"
+        bars = plt.bar(xs, ys, width, label=label, color=color)
+        for bar, op in zip(bars, ops):
+            reference = matrix[op].get(("libaio", 1))
+            if reference is None or combo not in matrix[op]:
+                continue
+            plt.annotate(
+                f"{matrix[op][combo] / reference:.2f}x",
+                (bar.get_x() + bar.get_width() / 2, bar.get_height()),
+                ha="center",
+                va="bottom",
+                fontsize="x-small",
+            )
+
+    plt.xticks([x + 0.4 - width / 2 for x in range(len(ops))], ops, rotation=30, ha="right")
+    ax = plt.gca()
+    ax.legend(bbox_to_anchor=(0.5, -0.35), loc="upper center", ncol=2)
+    plt.ylabel(unit)
+    plt.tight_layout()
+    plt.title(f"I/O engines, {unit}, StorageClass {sc}")
+    pdf.savefig()
+    plt.close()
+
+
+def plot_slowdown(pdf, sc, bench_data: Benchmarks):
+    """
+    Plot the throughput slowdown and the latency increase of each interference
+    result side by side.
+    """
+    labels, slowdowns, lat_slowdowns = bench_data.slowdowns(sc)
+    if len(slowdowns) == 0:
+        return
+
+    plt.figure(figsize=FIGSIZE_LEGEND)
+    height = 0.4
+    colors = gen_colors(3)[1:]
+    ys = range(len(slowdowns))
+    plt.barh(
+        [y - height / 2 for y in ys],
+        slowdowns,
+        height,
+        label="IOPS/bandwidth (isolated / under aggressor)",
+        color=colors[0],
+    )
+    plt.barh(
+        [y + height / 2 for y in ys],
+        # results without latencies get an empty bar
+        [0 if s is None else s for s in lat_slowdowns],
+        height,
+        label="Latency (under aggressor / isolated)",
+        color=colors[1],
+    )
+    plt.yticks(ys, labels)
+    # slowdown of 1 means no interference
+    plt.axvline(1, color="k", linestyle=":")
+    plt.xlabel("Slowdown")
+    ax = plt.gca()
+    ax.legend(bbox_to_anchor=(0.5, -0.15), loc="upper center")
+    plt.tight_layout()
+    plt.title(f"Interference, StorageClass {sc}")
+    pdf.savefig()
+    plt.close()
+
+
 def render_results(results, filename="results.pdf"):
     bench_data = Benchmarks()
     for r in results:
         bd = BenchData(r)
+        if len(bd.means) == 0:
+            print(f"No successful iterations for {bd.op} on {bd.storageclass}, skipping")
+            continue
         bench_data[bd.name] = bd
 
     plt.rcParams["image.cmap"] = "PuOr"
@@ -215,18 +404,24 @@ def render_results(results, filename="results.pdf"):
     with PdfPages(filename) as pdf:
         for d in bench_data.values():
             plt.figure(figsize=FIGSIZE)
-            xs = range(1, d.iterations + 1)
+            xs = range(1, len(d.means) + 1)
             plt.xticks(xs)
             plt.errorbar(xs, d.means, yerr=d.stddevs)
             plt.fill_between(xs, d.means - d.stddevs, d.means + d.stddevs, alpha=0.5)
             plt.plot(xs, d.maxs, "b:")
             plt.plot(xs, d.mins, "b:")
+            if d.aggressor is not None:
+                baseline_xs = range(1, len(d.baseline_means) + 1)
+                plt.plot(baseline_xs, d.baseline_means, "k--", label="isolated")
+                plt.legend()
             ax = plt.gca()
             ax.set_ylim(0, d.ylim)
             plt.xlabel("Iteration")
             plt.ylabel(d.unit)
             plt.tight_layout()
             title = f"{d.storageclass} / {d.op}"
+            if d.aggressor is not None:
+                title = f"{title} / {d.aggressor}"
             plt.title(title)
             pdf.savefig()
             plt.close()
@@ -237,6 +432,14 @@ def render_results(results, filename="results.pdf"):
         # plot bandwidth comparison for all storageclasses
         plot_all_sc(pdf, "Bandwidth, no fsync", "KB/s", bench_data, fsync=0)
         plot_all_sc(pdf, "Bandwidth, fsync=1", "KB/s", bench_data, fsync=1)
+        # plot file operation rates for all storageclasses
+        plot_all_sc(pdf, "File operations", "files/s", bench_data)
+        # plot provisioning latencies for all storageclasses
+        plot_all_sc(pdf, "Provisioning latency", "s", bench_data)
+
+        for unit in bench_data.data_by_type:
+            plot_timeline(pdf, unit, bench_data)
+            plot_timeline(pdf, unit, bench_data, interference=True)
 
         for sc in bench_data.storageclasses:
             plot_sc(
@@ -251,3 +454,18 @@ def render_results(results, filename="results.pdf"):
                 sc,
                 bench_data,
             )
+            plot_sc(
+                pdf,
+                "files/s",
+                sc,
+                bench_data,
+            )
+            plot_sc(
+                pdf,
+                "s",
+                sc,
+                bench_data,
+            )
+            plot_matrix(pdf, sc, "IOPS", bench_data)
+            plot_matrix(pdf, sc, "KB/s", bench_data)
+            plot_slowdown(pdf, sc, bench_data)
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3.8
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from datetime import datetime, timedelta
+
+from bench import (
+    AGGRESSORS,
+    BENCHMARKS,
+    IOENGINES,
+    expand_matrix,
+    extract_results,
+    render_fio_config,
+    run_kubestr,
+)
+from data import BenchData
+from graphs import Benchmarks, render_results
+from replay import synth_job, wrap_output
+
+REPLAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replay.py")
+
+# Benchmarks which are also included across the engine matrix, and under
+# each aggressor, in the synthetic results corpus
+MATRIX_BENCHMARKS = ["read_iops", "write_bw"]
+INTERFERENCE_BENCHMARKS = ["read_iops", "write_iops"]
+
+
+def synthetic_outputs(storageclasses, iterations, fmt="list", seed=0):
+    """
+    Generate raw kubestr outputs for all benchmarks, storage classes and
+    iterations. Returns a list of (benchname, storageclass, output) tuples.
+    """
+    rng = random.Random(seed)
+    outputs = []
+    for sc in storageclasses:
+        for benchname, bench in BENCHMARKS.items():
+            fio_config = render_fio_config(bench["fio_op"], **bench["params"])
+            for _ in range(iterations):
+                outputs.append((benchname, sc, wrap_output(synth_job(fio_config, sc, rng), fmt)))
+    return outputs
+
+
+def _synthetic_iterations(bench, storageclass, iterations, rng, start, latency=False):
+    """
+    Generate `iterations` extracted results of `bench`, started one minute
+    apart from `start`. With `latency`, the results include latencies as in
+    the interference mode.
+    """
+    params = bench["params"]
+    if latency:
+        params = {**params, "gtod_reduce": 0}
+    fio_config = render_fio_config(bench["fio_op"], **params)
+    results = []
+    for i in range(iterations):
+        output = wrap_output(synth_job(fio_config, storageclass, rng))
+        data = extract_results(bench["fio_op"], output, latency=latency)
+        data["timestamp"] = (start + timedelta(minutes=i)).isoformat()
+        results.append(data)
+    return results
+
+
+def synthetic_results(storageclasses, iterations, seed=0):
+    """
+    Generate a results corpus in the format emitted by `bench.py`. Besides
+    all benchmarks, the corpus contains engine matrix results of
+    `MATRIX_BENCHMARKS` and interference results of
+    `INTERFERENCE_BENCHMARKS` under each aggressor.
+    """
+    rng = random.Random(seed)
+    start = datetime(2021, 1, 1)
+    results = []
+
+    def _result(benchname, sc, bench, latency=False, **kwargs):
+        return {
+            "name": benchname,
+            "storageclass": sc,
+            "iterations": iterations,
+            "results": _synthetic_iterations(bench, sc, iterations, rng, start, latency=latency),
+            **kwargs,
+        }
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for sc in storageclasses:
+            for benchname, bench in BENCHMARKS.items():
+                results.append(_result(benchname, sc, bench))
+            matrix = expand_matrix(
+                [(b, BENCHMARKS[b]) for b in MATRIX_BENCHMARKS],
+                ioengines=IOENGINES,
+                directs=[0, 1],
+            )
+            for benchname, bench in matrix:
+                results.append(
+                    _result(
+                        benchname,
+                        sc,
+                        bench,
+                        ioengine=bench["params"]["ioengine"],
+                        direct=bench["params"]["direct"],
+                    )
+                )
+            for aggressorname in AGGRESSORS:
+                for benchname in INTERFERENCE_BENCHMARKS:
+                    bench = BENCHMARKS[benchname]
+                    baseline = _synthetic_iterations(
+                        bench, sc, iterations, rng, start, latency=True
+                    )
+                    results.append(
+                        _result(
+                            benchname,
+                            sc,
+                            bench,
+                            latency=True,
+                            baseline=baseline,
+                            aggressor=aggressorname,
+                            aggressor_results=[],
+                        )
+                    )
+    return results
+
+
+def _extract_all(outputs):
+    for benchname, _, output in outputs:
+        extract_results(BENCHMARKS[benchname]["fio_op"], output)
+
+
+def _load_all(results):
+    return [BenchData(r) for r in results]
+
+
+def _query_all(results):
+    bench_data = Benchmarks()
+    for bd in _load_all(results):
+        bench_data[bd.name] = bd
+    for unit in bench_data.data_by_type:
+        for fsync in [0, 1]:
+            bench_data.labels(unit, fsync=fsync, add_mean=True)
+            bench_data.means(unit, fsync=fsync)
+            bench_data.stddevs(unit, fsync=fsync)
+            bench_data.ylims(unit, fsync=fsync)
+        for sc in bench_data.storageclasses:
+            bench_data.labels(unit, sc=sc, add_mean=True)
+            bench_data.means(unit, sc=sc)
+            bench_data.stddevs(unit, sc=sc)
+            bench_data.ylims(unit, sc=sc)
+            bench_data.matrix(sc, unit)
+    for sc in bench_data.storageclasses:
+        bench_data.slowdowns(sc)
+
+
+def _render(results):
+    with tempfile.TemporaryDirectory() as tmpd:
+        render_results(results, filename=f"{tmpd}/results.pdf")
+
+
+def _run_replay(count):
+    fio_config = render_fio_config(BENCHMARKS["read_iops"]["fio_op"])
+    for _ in range(count):
+        run_kubestr("perf", fio_config, kubestr=REPLAY)
+
+
+def timeit(fn, *args, repeat=3, min_sec=0.2):
+    """
+    Run `fn(*args)` in a loop until at least `min_sec` seconds have passed,
+    and return the time per call in seconds for each of `repeat` loops. The
+    loop size is determined once, similar to `timeit.Timer.autorange`, so that
+    sub-millisecond cases are timed with enough calls to be stable. Output of
+    `fn` is discarded.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn(*args)
+            if time.perf_counter() - start >= min_sec:
+                break
+            number = number * 2
+
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn(*args)
+            times.append((time.perf_counter() - start) / number)
+    return times
+
+
+def run_suite(sizes, iterations=10, repeat=3, render=True, replay=0, min_sec=0.2):
+    """
+    Time the harness stages on synthetic corpora with `size` storage classes
+    for each entry in `sizes`. Returns a dict mapping case names to timing
+    summaries.
+    """
+    timings = {}
+
+    def _record(case, times):
+        timings[case] = {
+            "min": min(times),
+            "median": statistics.median(times),
+            "repeat": len(times),
+        }
+        print(
+            f"{case:<40} min {min(times) * 1000:10.2f}ms"
+            + f" median {statistics.median(times) * 1000:10.2f}ms"
+        )
+
+    def _timeit(fn, *args):
+        return timeit(fn, *args, repeat=repeat, min_sec=min_sec)
+
+    for size in sizes:
+        storageclasses = [f"sc-{i}" for i in range(size)]
+        results = synthetic_results(storageclasses, iterations)
+        for fmt in ["dict", "list"]:
+            outputs = synthetic_outputs(storageclasses, iterations, fmt=fmt)
+            _record(f"extract_results/{fmt}/{size}", _timeit(_extract_all, outputs))
+        _record(f"BenchData/{size}", _timeit(_load_all, results))
+        _record(f"Benchmarks/{size}", _timeit(_query_all, results))
+        if render:
+            _record(f"render_results/{size}", _timeit(_render, results))
+
+    if replay > 0:
+        _record(f"run_kubestr/replay/{replay}", _timeit(_run_replay, replay))
+
+    return timings
+
+
+def compare(timings, baseline, threshold):
+    """
+    Compare `timings` against `baseline`. Returns the list of cases whose
+    median is slower than the baseline median by more than `threshold`.
+    """
+    regressions = []
+    for case, t in timings.items():
+        if case not in baseline:
+            continue
+        ratio = t["median"] / baseline[case]["median"]
+        if ratio > 1 + threshold:
+            print(f"Regression in {case}: {ratio:.2f}x slower than baseline")
+            regressions.append(case)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the overhead of the benchmark harness on synthetic result corpora"
+    )
+    parser.add_argument(
+        "-S",
+        "--sizes",
+        default="1,4,16",
+        help="Comma-separated list of corpus sizes, in number of storage classes.",
+    )
+    parser.add_argument(
+        "-i",
+        "--iterations",
+        type=int,
+        default=10,
+        help="Amount of iterations for each benchmark,storage class pair in the corpus.",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        help="How often the timing loop of each case is run.",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="Minimum duration in seconds of each timing loop. Fast cases are called"
+        + " repeatedly within the loop, and the time per call is reported.",
+    )
+    parser.add_argument(
+        "--no-render",
+        action="store_true",
+        help="Skip timing `render_results`, which dominates the runtime of the suite.",
+    )
+    parser.add_argument(
+        "--replay",
+        type=int,
+        default=0,
+        help="Additionally time this many `run_kubestr` calls against `replay.py`.",
+    )
+    parser.add_argument(
+        "-O",
+        "--output-directory",
+        default=".",
+        help="Directory in which the json timings are stored.",
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Timings file of an earlier run. Exit with an error if any case is slower"
+        + " than the baseline by more than the threshold.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown compared to the baseline.",
+    )
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    timings = run_suite(
+        sizes,
+        iterations=args.iterations,
+        repeat=args.repeat,
+        render=not args.no_render,
+        replay=args.replay,
+        min_sec=args.min_time,
+    )
+
+    timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
+    with open(f"{args.output_directory}/perf_{timestamp}.json", "w") as perff:
+        json.dump(timings, perff)
+
+    if args.baseline is not None:
+        with open(args.baseline) as basef:
+            baseline = json.load(basef)
+        if len(compare(timings, baseline, args.threshold)) > 0:
+            sys.exit(1)
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3.8
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from pprint import PrettyPrinter
+
+pp = PrettyPrinter(indent=2)
+
+
+def kubectl(args, kubectl="kubectl", namespace=None, input=None):
+    cmd = [kubectl]
+    if namespace != None:
+        cmd.extend(["-n", namespace])
+    cmd.extend(args)
+    result = subprocess.run(
+        cmd,
+        capture_output=True,
+        input=input.encode("utf-8") if input is not None else None,
+    )
+    if result.returncode != 0:
+        raise Exception(f"Error running kubectl {' '.join(args)}: {result.stderr}")
+    return result.stdout.decode("utf-8")
+
+
+def render_pvc(name, storage_class, size, snapshot=None):
+    pvc = {
+        "apiVersion": "v1",
+        "kind": "PersistentVolumeClaim",
+        "metadata": {
+            "name": name,
+            "labels": {"app": "storage-bench-provision"},
+        },
+        "spec": {
+            "accessModes": ["ReadWriteOnce"],
+            "storageClassName": storage_class,
+            "resources": {"requests": {"storage": size}},
+        },
+    }
+    if snapshot is not None:
+        pvc["spec"]["dataSource"] = {
+            "name": snapshot,
+            "kind": "VolumeSnapshot",
+            "apiGroup": "snapshot.storage.k8s.io",
+        }
+    return pvc
+
+
+def render_pod(name, pvc_name, image):
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {
+            "name": name,
+            "labels": {"app": "storage-bench-provision"},
+        },
+        "spec": {
+            "containers": [
+                {
+                    "name": "provision",
+                    "image": image,
+                    "command": ["/bin/sh", "-c", "tail -f /dev/null"],
+                    "volumeMounts": [{"name": "data", "mountPath": "/data"}],
+                }
+            ],
+            "terminationGracePeriodSeconds": 0,
+            "volumes": [
+                {
+                    "name": "data",
+                    "persistentVolumeClaim": {"claimName": pvc_name},
+                }
+            ],
+        },
+    }
+
+
+def provision_volume(
+    storage_class,
+    size="1Gi",
+    snapshot=None,
+    image="busybox:1.33",
+    namespace=None,
+    kubectl_cmd="kubectl",
+    timeout_sec=600,
+):
+    """
+    Create a PVC and a pod which mounts it, and wait until the pod is ready.
+    Returns the time in seconds until the PVC was bound, and the time between
+    the PVC getting bound and the pod becoming ready.
+
+    The pod is created right away, so that storage classes with volume binding
+    mode `WaitForFirstConsumer` get bound as well. Both events are observed
+    with `kubectl wait`, which watches the objects instead of polling them.
+    """
+    name = f"storage-bench-provision-{uuid.uuid4().hex[:8]}"
+
+    def _kubectl(args, input=None):
+        return kubectl(args, kubectl=kubectl_cmd, namespace=namespace, input=input)
+
+    def _create(obj):
+        _kubectl(["create", "-f", "-", "-o", "name"], input=json.dumps(obj))
+
+    def _wait(condition, obj):
+        _kubectl(["wait", f"--for={condition}", f"--timeout={timeout_sec}s", obj])
+        return time.monotonic() - start
+
+    start = time.monotonic()
+    _create(render_pvc(name, storage_class, size, snapshot))
+    waiters = ThreadPoolExecutor(max_workers=2)
+    try:
+        # Start watching the PVC before creating the pod, storage classes
+        # with immediate binding may bind it in the meantime.
+        bound_future = waiters.submit(_wait, "jsonpath={.status.phase}=Bound", f"pvc/{name}")
+        _create(render_pod(name, name, image))
+        ready_future = waiters.submit(_wait, "condition=Ready", f"pod/{name}")
+        bound = bound_future.result()
+        ready = ready_future.result()
+    finally:
+        _kubectl(["delete", "pod", name, "--ignore-not-found"])
+        _kubectl(["delete", "pvc", name, "--ignore-not-found"])
+        # Waits which are still pending fail once the objects are gone. PVCs
+        # of storage classes with `WaitForFirstConsumer` binding never get
+        # bound if creating the pod failed.
+        waiters.shutdown(wait=True)
+
+    return {
+        "bind": bound,
+        "attach": ready - bound,
+    }
+
+
+def _stats(samples):
+    stddev = 0
+    if len(samples) > 1:
+        stddev = statistics.stdev(samples)
+    return {
+        "display": statistics.mean(samples),
+        "max": max(samples),
+        "mean": statistics.mean(samples),
+        "min": min(samples),
+        "stddev": stddev,
+        "samples": samples,
+    }
+
+
+def run_provisioning(
+    storageclass,
+    concurrency=1,
+    iters=5,
+    verbose=False,
+    snapshot=None,
+    warmup=1,
+    **kwargs,
+):
+    """
+    Provision `concurrency` volumes in parallel for each iteration. Returns
+    one result for the bind latency and one for the attach latency, with
+    statistics across the concurrently provisioned volumes for each
+    iteration. Additional keyword arguments are passed to `provision_volume`.
+
+    The pods' image is pulled on first use on each node, which would count
+    towards the attach latency. `warmup` untimed iterations are run first to
+    pull it on the nodes.
+    """
+    prefix = "provision"
+    if snapshot is not None:
+        prefix = "provision_restore"
+    print(
+        f"Running {prefix} benchmark with {concurrency} concurrent volume(s)",
+        file=sys.stderr,
+    )
+    results = {
+        "bind": [],
+        "attach": [],
+    }
+    i = 0
+    retry = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for w in range(warmup):
+            print(f"Executing warm-up iteration {w+1}", file=sys.stderr)
+            futures = [
+                executor.submit(provision_volume, storageclass, snapshot=snapshot, **kwargs)
+                for _ in range(concurrency)
+            ]
+            wait(futures)
+            for f in futures:
+                if f.exception() is not None:
+                    print(f"Error during warm-up iteration {w+1}:")
+                    print(f.exception())
+
+        while i < iters:
+            futures = []
+            try:
+                print(f"Executing iteration {i+1}", file=sys.stderr)
+                started = datetime.now().isoformat()
+                futures = [
+                    executor.submit(provision_volume, storageclass, snapshot=snapshot, **kwargs)
+                    for _ in range(concurrency)
+                ]
+                volumes = [f.result() for f in futures]
+                data = {k: _stats([v[k] for v in volumes]) for k in results}
+                for v in data.values():
+                    v["timestamp"] = started
+                if verbose:
+                    pp.pprint(data)
+                for k, v in data.items():
+                    results[k].append(v)
+                i = i + 1
+                retry = 0
+            except Exception as e:
+                print(f"Error during iteration {i}:")
+                print(e)
+                # Don't overlap the next attempt with leftover volumes, which
+                # would exceed the requested concurrency.
+                wait(futures)
+                if retry < 3:
+                    print("Retrying iteration")
+                    retry = retry + 1
+                else:
+                    print(f"Giving up on iteration {i} after {retry} tries")
+                    i = i + 1
+                    retry = 0
+
+    for k, v in results.items():
+        if len(v) == 0:
+            print(f"No successful iterations for {k} latency")
+            continue
+        mean_of_means = statistics.mean([r["mean"] for r in v])
+        print(f"Mean {k} latency {mean_of_means:.2f}s")
+
+    return [
+        {
+            "name": f"{prefix}_{k}",
+            "storageclass": storageclass,
+            "iterations": iters,
+            "concurrency": concurrency,
+            "results": v,
+        }
+        for k, v in results.items()
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure PVC provisioning and attach latency of a K8s storage class"
+    )
+
+    storage_class_default = None
+    if "STORAGE_CLASSES" in os.environ:
+        storage_class_default = os.environ["STORAGE_CLASSES"].split(",")
+
+    parser.add_argument(
+        "-s",
+        "--storage-class",
+        action="append",
+        help="Select storage class(es) to benchmark. Can be repeated. "
+        + " Defaults to the value of environment variable STORAGE_CLASSES."
+        + " Multiple values can be separated by commas in the environment variable.",
+        default=storage_class_default,
+    )
+    concurrency_default = [1]
+    if "PROVISION_CONCURRENCY" in os.environ:
+        concurrency_default = [int(c) for c in os.environ["PROVISION_CONCURRENCY"].split(",")]
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        action="append",
+        help="Amount of volumes to provision concurrently. Can be repeated."
+        + " Defaults to the value of environment variable PROVISION_CONCURRENCY."
+        + " Multiple values can be separated by commas in the environment variable.",
+    )
+    default_iters = 5
+    try:
+        default_iters = int(os.environ.get("BENCH_ITERATIONS", "5"))
+    except:
+        print("Unable to parse value of environment variable BENCH_ITERATIONS as int, ignoring it")
+    parser.add_argument(
+        "-i",
+        "--iterations",
+        type=int,
+        default=default_iters,
+        help="Amount of iterations for each concurrency,storage class pair"
+        + " Defaults to the value of environment variable BENCH_ITERATIONS.",
+    )
+    parser.add_argument(
+        "-S",
+        "--snapshot",
+        default=os.environ.get("RESTORE_SNAPSHOT"),
+        help="Additionally measure restoring volumes from this VolumeSnapshot."
+        + " Defaults to the value of environment variable RESTORE_SNAPSHOT.",
+    )
+    parser.add_argument(
+        "-z",
+        "--size",
+        default=os.environ.get("PROVISION_SIZE", "1Gi"),
+        help="Size of the provisioned volumes. Must not be smaller than the snapshot."
+        + " Defaults to the value of environment variable PROVISION_SIZE.",
+    )
+    parser.add_argument(
+        "--image",
+        default=os.environ.get("PROVISION_IMAGE", "busybox:1.33"),
+        help="Image for the pods which mount the provisioned volumes."
+        + " Defaults to the value of environment variable PROVISION_IMAGE.",
+    )
+    default_warmup = 1
+    try:
+        default_warmup = int(os.environ.get("PROVISION_WARMUP", "1"))
+    except:
+        print("Unable to parse value of environment variable PROVISION_WARMUP as int, ignoring it")
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=default_warmup,
+        help="Amount of untimed iterations before each benchmark, which pull the pods' image"
+        + " on the nodes. Defaults to the value of environment variable PROVISION_WARMUP.",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=600,
+        help="Seconds to wait for a volume to be bound and attached.",
+    )
+
+    verbose_default_str = os.environ.get("VERBOSE", "false")
+    verbose_default = verbose_default_str in ["True", "true", "1", "yes"]
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        default=verbose_default,
+        help="Verbose output. Defaults to value of environment variable VERBOSE."
+        + " Valid values to enable verbose mode are 'True', 'true', '1' and 'yes'.",
+    )
+    parser.add_argument(
+        "-O",
+        "--output-directory",
+        default=os.environ.get("OUTPUT_DIRECTORY", "."),
+        help="Directory in which the json results are stored."
+        + " Defaults to the value of environment variable OUTPUT_DIRECTORY.",
+    )
+    parser.add_argument(
+        "-n",
+        "--namespace",
+        default=os.environ.get("BENCH_NAMESPACE"),
+        help="Namespace in which to run the benchmark."
+        + " Defaults to the value of environment variable BENCH_NAMESPACE.",
+    )
+    parser.add_argument(
+        "-k",
+        "--kubectl",
+        default=os.environ.get("KUBECTL", "kubectl"),
+        help="kubectl executable to use, e.g. `./fakekube.py` to run against a fake cluster."
+        + " Defaults to the value of environment variable KUBECTL.",
+    )
+    args = parser.parse_args()
+
+    if args.storage_class is None or len(args.storage_class) == 0:
+        parser.print_help()
+        sys.exit(1)
+    if args.concurrency is None:
+        args.concurrency = concurrency_default
+
+    timestamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
+    filename = f"{args.output_directory}/provision_results_{timestamp}"
+
+    snapshots = [None]
+    if args.snapshot is not None:
+        snapshots.append(args.snapshot)
+
+    results = []
+    for sc in args.storage_class:
+        print(f"Running provisioning benchmarks for storage class {sc}")
+        for snapshot in snapshots:
+            for concurrency in args.concurrency:
+                rs = run_provisioning(
+                    sc,
+                    concurrency=concurrency,
+                    iters=args.iterations,
+                    verbose=args.verbose,
+                    snapshot=snapshot,
+                    warmup=args.warmup,
+                    size=args.size,
+                    image=args.image,
+                    namespace=args.namespace,
+                    kubectl_cmd=args.kubectl,
+                    timeout_sec=args.timeout,
+                )
+                results.extend(rs)
+
+                print("Updating results file")
+                with open(f"{filename}.json", "w") as resf:
+                    json.dump(results, resf)
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3.8
+
+import argparse
+import fcntl
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from typing import Dict, List, Union
+
+# Baseline means used when no recording is provided. The values are in the
+# range of what we've observed for network block storage.
+SYNTH_MEANS = {
+    "iops": {
+        "read": 8000.0,
+        "write": 3000.0,
+    },
+    "bw": {
+        "read": 250000.0,
+        "write": 120000.0,
+    },
+    # file operations per second, accounted as reads by fio
+    "files": {
+        "read": 1500.0,
+    },
+}
+
+# Rough factors for other I/O engines and buffered I/O compared to libaio with
+# direct I/O.
+SYNTH_ENGINE_SCALE = {
+    "libaio": 1.0,
+    "io_uring": 1.2,
+    "psync": 0.3,
+}
+SYNTH_BUFFERED_SCALE = {
+    "read": 3.0,
+    "write": 1.5,
+}
+
+
+def parse_fio_config(fio_config: str):
+    """
+    Extract job name and readwrite mode from a fio job file as rendered by
+    `bench.render_fio_config`.
+    """
+    params = {}
+    for line in fio_config.splitlines():
+        line = line.strip()
+        if "=" not in line or line.startswith(("#", ";", "[")):
+            continue
+        key, value = line.split("=", 1)
+        params[key.strip()] = value.strip()
+    return params
+
+
+def _direction_data(rng: random.Random, mean_iops, mean_bw, jitter):
+    def _sample(mean):
+        return max(mean * (1 + rng.uniform(-jitter, jitter)), 0.0)
+
+    iops_mean = _sample(mean_iops)
+    bw_mean = _sample(mean_bw)
+    return {
+        "iops": iops_mean,
+        "iops_max": int(iops_mean * (1 + jitter * 2)),
+        "iops_mean": iops_mean,
+        "iops_min": int(iops_mean * (1 - jitter * 2)),
+        "iops_stddev": iops_mean * jitter / 2,
+        "bw": int(bw_mean),
+        "bw_max": int(bw_mean * (1 + jitter * 2)),
+        "bw_mean": bw_mean,
+        "bw_min": int(bw_mean * (1 - jitter * 2)),
+        "bw_dev": bw_mean * jitter / 2,
+        "clat_ns": {
+            "min": int(1e9 / iops_mean * (1 - jitter * 2)),
+            "max": int(1e9 / iops_mean * (1 + jitter * 20)),
+            "mean": 1e9 / iops_mean,
+            "stddev": 1e9 / iops_mean * jitter,
+        },
+    }
+
+
+def _runtime_ms(params, iops):
+    """
+    Runtime of the measured part of the job, as reported by fio in
+    `job_runtime`.
+    """
+    if "runtime" in params:
+        return int(params["runtime"].rstrip("s")) * 1000
+    # file operation jobs end after all files are processed
+    files = int(params.get("nrfiles", "1")) * int(params.get("numjobs", "1"))
+    return int(files / iops * 1000)
+
+
+def _idle_direction_data():
+    return {
+        "iops": 0.0,
+        "iops_max": 0,
+        "iops_mean": 0.0,
+        "iops_min": 0,
+        "iops_stddev": 0.0,
+        "bw": 0,
+        "bw_max": 0,
+        "bw_mean": 0.0,
+        "bw_min": 0,
+        "bw_dev": 0.0,
+        "clat_ns": {
+            "min": 0,
+            "max": 0,
+            "mean": 0.0,
+            "stddev": 0.0,
+        },
+    }
+
+
+def synth_job(fio_config: str, storage_class: str, rng: random.Random, jitter=0.1):
+    """
+    Generate a fio job result for `fio_config`. The scale of the results is
+    derived from the storage class name, so that different storage classes
+    produce distinguishable (but reproducible) numbers.
+    """
+    params = parse_fio_config(fio_config)
+    rw = params.get("readwrite", "randread")
+    name = params.get("name", "job")
+    direction = "write" if "write" in rw else "read"
+    metric = name.rsplit("_", 1)[-1]
+
+    scale = random.Random(storage_class).uniform(0.25, 2.0)
+    # fsync'ed writes are a lot slower than unsynced writes
+    fsync = int(params.get("fsync", "0"))
+    if fsync > 0:
+        scale = scale * min(1.0, 0.1 + fsync / 128)
+    if metric != "files":
+        scale = scale * SYNTH_ENGINE_SCALE.get(params.get("ioengine"), 1.0)
+        if params.get("direct") == "0":
+            scale = scale * SYNTH_BUFFERED_SCALE[direction]
+
+    mean_iops = SYNTH_MEANS["iops"][direction]
+    if metric == "files":
+        mean_iops = SYNTH_MEANS["files"][direction]
+    active = _direction_data(
+        rng,
+        mean_iops * scale,
+        SYNTH_MEANS["bw"][direction] * scale,
+        jitter,
+    )
+    if metric == "bw":
+        # large blocks: IOPS follow from bandwidth at 128K blocksize
+        active["iops"] = active["bw_mean"] / 128
+    if metric != "files" and params.get("gtod_reduce", "0") == "1":
+        # fio doesn't measure latencies with gtod_reduce
+        active["clat_ns"] = _idle_direction_data()["clat_ns"]
+    job = {
+        "jobname": name,
+        "job_runtime": _runtime_ms(params, active["iops"]),
+        "read": _idle_direction_data(),
+        "write": _idle_direction_data(),
+    }
+    # fio samples IOPS and bandwidth in 500ms windows, and reports zeros for
+    # the sampled values of jobs which end before the first window
+    samples = job["job_runtime"] // 500
+    active["iops_samples"] = samples
+    active["bw_samples"] = samples
+    if samples == 0:
+        for key in ["iops_max", "iops_mean", "iops_min", "iops_stddev"]:
+            active[key] = 0
+    job[direction] = active
+    return job
+
+
+def wrap_output(job: Dict, fmt="list"):
+    """
+    Wrap a fio job result in the JSON structure emitted by kubestr. `fmt`
+    selects between the old ("dict") and new ("list") kubestr output format.
+    """
+    output = {
+        "Name": "FIO test results",
+        "Status": "OK",
+        "Raw": {
+            "result": {
+                "fio version": "fio-3.20",
+                "jobs": [job],
+            },
+        },
+    }
+    if fmt == "dict":
+        return output
+    if fmt == "list":
+        return [output]
+    raise ValueError(f"Unknown kubestr output format: {fmt}")
+
+
+def load_recording(path: str) -> List[Union[List, Dict]]:
+    """
+    Load captured kubestr outputs. The recording is a file with one captured
+    kubestr JSON output (either format) per line.
+    """
+    recorded = []
+    with open(path) as recf:
+        for line in recf:
+            line = line.strip()
+            if line:
+                recorded.append(json.loads(line))
+    if len(recorded) == 0:
+        raise ValueError(f"No recorded outputs in {path}")
+    return recorded
+
+
+def _recorded_jobname(output: Union[List, Dict]):
+    if isinstance(output, list):
+        output = output[0]
+    try:
+        return output["Raw"]["result"]["jobs"][0]["jobname"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def pick_recorded(recorded: List, fio_config: str, rng: random.Random):
+    """
+    Pick a recorded output which matches the job name of `fio_config`, fall
+    back to any recorded output if there's no match.
+    """
+    name = parse_fio_config(fio_config).get("name")
+    matching = [r for r in recorded if _recorded_jobname(r) == name]
+    if len(matching) == 0:
+        matching = recorded
+    return rng.choice(matching)
+
+
+def restamp(output: Union[List, Dict], now: float):
+    """
+    Set the time at which fio finished in `output` to `now`, so that replayed
+    jobs appear to have run during the replay.
+    """
+    if isinstance(output, list):
+        output = output[0]
+    fio = output["Raw"]["result"]
+    fio["timestamp"] = int(now)
+    fio["timestamp_ms"] = int(now * 1000)
+    fio["time"] = time.strftime("%a %b %d %H:%M:%S %Y", time.localtime(now))
+
+
+def convert_format(output: Union[List, Dict], fmt: str):
+    if fmt == "list" and isinstance(output, dict):
+        return [output]
+    if fmt == "dict" and isinstance(output, list):
+        return output[0]
+    return output
+
+
+def next_call(state_path: str, key: str):
+    """
+    Increment and return the call counter for `key` stored in `state_path`.
+    The file is locked, as `bench.py` runs replays concurrently in
+    interference mode.
+    """
+    with open(state_path, "a+") as statef:
+        fcntl.flock(statef, fcntl.LOCK_EX)
+        statef.seek(0)
+        counters = json.loads(statef.read().strip() or "{}")
+        counter = counters.get(key, 0)
+        counters[key] = counter + 1
+        statef.seek(0)
+        statef.truncate()
+        json.dump(counters, statef)
+    return counter
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay recorded kubestr fio output. Accepts the same arguments as"
+        + " `kubestr fio` as invoked by `bench.py`. The replay is configured through"
+        + " environment variables REPLAY_RECORDING, REPLAY_FORMAT, REPLAY_DELAY,"
+        + " REPLAY_FAIL_RATE, REPLAY_FAILURE, REPLAY_SEED, REPLAY_RUN and REPLAY_STATE."
+    )
+    parser.add_argument("command", choices=["fio"])
+    parser.add_argument("-s", "--storageclass", default="")
+    parser.add_argument("-f", "--fiofile", required=True)
+    parser.add_argument("-z", "--size")
+    parser.add_argument("-o", "--output")
+    parser.add_argument("-p", "--pvc")
+    parser.add_argument("-n", "--namespace", default="default")
+    args = parser.parse_args()
+
+    # If unset, recorded outputs are replayed in their original format, and
+    # synthetic outputs use the new list format.
+    fmt = os.environ.get("REPLAY_FORMAT")
+    delay = float(os.environ.get("REPLAY_DELAY", "0"))
+    fail_rate = float(os.environ.get("REPLAY_FAIL_RATE", "0"))
+    failure = os.environ.get("REPLAY_FAILURE", "error")
+    seed = os.environ.get("REPLAY_SEED")
+
+    with open(args.fiofile) as fiof:
+        fio_config = fiof.read()
+
+    rng = random.Random(seed)
+    if seed is not None:
+        # Derive a separate stream for each invocation from the storage class,
+        # the fio job and how often the job was run on the storage class in
+        # the current run. Seeded replays are reproducible across runs, and
+        # concurrent invocations of other jobs don't shift the stream.
+        # Invocations of a run are identified by the calling process, unless
+        # REPLAY_RUN is set.
+        run = os.environ.get("REPLAY_RUN", str(os.getppid()))
+        state_path = os.environ.get(
+            "REPLAY_STATE", os.path.join(tempfile.gettempdir(), f"replay-{seed}-{run}.state")
+        )
+        stream = f"{args.storageclass}\n{fio_config}"
+        rng = random.Random(f"{seed}\n{stream}\n{next_call(state_path, stream)}")
+
+    if args.pvc is not None:
+        print(f"Existing PVC found {args.pvc}")
+    else:
+        print("PVC created kubestr-fio-pvc-replay")
+    print("Pod created kubestr-fio-pod-replay")
+    print(f"Running FIO test ({args.fiofile}) on StorageClass ({args.storageclass})")
+    sys.stdout.flush()
+
+    time.sleep(delay)
+
+    if rng.random() < fail_rate:
+        if failure == "nojson":
+            print("Failed while running FIO test.")
+            sys.exit(0)
+        print("Error: Failed while running FIO test.: replayed failure", file=sys.stderr)
+        sys.exit(1)
+
+    if "REPLAY_RECORDING" in os.environ:
+        recorded = load_recording(os.environ["REPLAY_RECORDING"])
+        output = convert_format(pick_recorded(recorded, fio_config, rng), fmt)
+    else:
+        output = wrap_output(synth_job(fio_config, args.storageclass, rng), fmt=fmt or "list")
+    restamp(output, time.time())
+
+    print(json.dumps(output, indent=2))